@@ -15,6 +15,7 @@ from modules.semantic_search import SemanticSearch
 from modules.summarizer import Summarizer
 from modules.quiz_generator import QuizGenerator
 from modules.document_manager import DocumentManager
+from modules.profiler import RequestProfiler
 
 # --------------------------------------------------
 # APP CONFIG
@@ -34,6 +35,7 @@ semantic_search = SemanticSearch()
 summarizer = Summarizer()
 quiz_generator = QuizGenerator()
 doc_manager = DocumentManager()
+profiler = RequestProfiler(app)
 
 # --------------------------------------------------
 # HELPERS
@@ -22,4 +22,13 @@ class Config:
     QUIZ_QUESTIONS_DEFAULT = 5
     
     # Summarization settings
-    SUMMARY_RATIO = 0.3  # 30% of original length
\ No newline at end of file
+    SUMMARY_RATIO = 0.3  # 30% of original length
+
+    # Profiling settings (off by default; see modules/profiler.py)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'  # profile every API request
+    PROFILING_SECRET = os.environ.get('PROFILING_SECRET')  # profile requests with a signed header
+    PROFILING_FOLDER = 'data/profiles'
+    PROFILING_TOP_N = 25
+    PROFILING_MAX_REPORTS = 100  # oldest reports are deleted beyond this
+    PROFILING_SIGNATURE_MAX_AGE = 300  # seconds a signed header may stay valid
+    PROFILING_TRACE_FRAMES = 25  # tracemalloc frames kept per allocation
\ No newline at end of file
@@ -0,0 +1,432 @@
+"""
+Load Test Harness
+Replays concurrent study sessions against a locally started app
+
+Usage:
+    python loadtest.py --sessions 50 --concurrency 10 --rate 2 --stub-encoder
+    python loadtest.py --url http://127.0.0.1:5000 --sessions 20
+"""
+
+import argparse
+import hashlib
+import http.client
+import http.cookiejar
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENDPOINTS = ['upload', 'study', 'ask', 'summarize', 'quiz']
+
+REQUEST_ERRORS = (urllib.error.URLError, http.client.HTTPException, OSError,
+                  ValueError, KeyError, TypeError)
+
+TOPICS = [
+    ('Photosynthesis', 'the process plants use to convert light energy into chemical energy'),
+    ('Mitochondria', 'the organelle that produces most of the energy of the cell'),
+    ('Osmosis', 'the movement of water across a semipermeable membrane'),
+    ('Inflation', 'the general rise in prices across an economy over time'),
+    ('Recursion', 'a technique where a function calls itself on a smaller input'),
+    ('Entropy', 'a measure of disorder within a thermodynamic system'),
+    ('Democracy', 'a system of government where citizens choose their representatives'),
+    ('Erosion', 'the gradual wearing away of rock and soil by wind and water'),
+]
+
+DETAILS = [
+    'Students often confuse this concept with related ideas from earlier chapters.',
+    'Understanding the underlying mechanism makes later material considerably easier.',
+    'Several experiments during the twentieth century confirmed these observations.',
+    'Examination questions frequently require applying this principle to unfamiliar situations.',
+    'Textbooks usually illustrate the mechanism with diagrams and worked examples.',
+]
+
+
+# --------------------------------------------------
+# STUB ENCODER
+# --------------------------------------------------
+class StubEncoder:
+    """Offline stand-in for SentenceTransformer using hashed bag-of-words vectors"""
+
+    dimension = 384
+    delay = 0.0
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name
+
+    def encode(self, sentences, convert_to_tensor=False, show_progress_bar=False):
+        """Encode one sentence or a list of sentences"""
+        import torch
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        single = isinstance(sentences, str)
+        batch = [sentences] if single else list(sentences)
+
+        vectors = torch.zeros(len(batch), self.dimension)
+        for row, sentence in enumerate(batch):
+            for word in re.findall(r'\w+', sentence.lower()):
+                bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension
+                vectors[row, bucket] += 1.0
+        vectors = torch.nn.functional.normalize(vectors, dim=1)
+
+        if single:
+            vectors = vectors[0]
+        return vectors if convert_to_tensor else vectors.numpy()
+
+
+# --------------------------------------------------
+# LOCAL SERVER
+# --------------------------------------------------
+def start_local_app(stub_encoder, workdir):
+    """Import the app inside a scratch directory and serve it on a free port"""
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+    # Uploads and the SQLite database use relative paths, keep them out of the repo
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    if stub_encoder:
+        import modules.semantic_search
+        modules.semantic_search.SentenceTransformer = StubEncoder
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# --------------------------------------------------
+# SESSIONS
+# --------------------------------------------------
+def build_document(rng, num_sentences):
+    """Generate a study document with definitions and filler sentences"""
+    sentences = []
+    while len(sentences) < num_sentences:
+        topic, definition = rng.choice(TOPICS)
+        sentences.append(f"{topic} is {definition}.")
+        sentences.append(rng.choice(DETAILS))
+    return ' '.join(sentences[:num_sentences])
+
+
+def encode_multipart(field, filename, content):
+    """Build a multipart/form-data body for a single file field"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Surface redirects as HTTP errors, e.g. /study/<id> bouncing to / for a missing document"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class StudySession:
+    """One simulated student sharing a cookie jar across requests"""
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        # The Flask session cookie carries current_doc_id between requests
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            NoRedirect()
+        )
+        # Requests not sent yet, counted as errors if the session stops early
+        self.pending = ['upload', 'study']
+        self.remaining = 0
+
+    def request(self, endpoint, path, data=None, content_type=None, parse=None):
+        """Send a request and record its latency, returns the (parsed) body or None"""
+        headers = {'Content-Type': content_type} if content_type else {}
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                body = response.read()
+            if parse:
+                body = parse(body)
+            ok = True
+        except REQUEST_ERRORS as e:
+            body = None
+            ok = False
+            self.recorder.note_error(endpoint, e)
+        self.recorder.record(endpoint, time.perf_counter() - start, ok)
+
+        return body
+
+    def post_json(self, endpoint, path, payload):
+        """POST a JSON payload"""
+        return self.request(endpoint, path, json.dumps(payload).encode(), 'application/json')
+
+    def run(self, rng, document, actions, mix, think_time):
+        """Upload, open the study page, then perform a mix of actions"""
+        self.remaining = actions
+
+        body, content_type = encode_multipart('file', f"loadtest_{uuid.uuid4().hex}.txt", document.encode())
+        doc_id = self.request('upload', '/upload', body, content_type,
+                              parse=lambda raw: int(json.loads(raw)['doc_id']))
+        self.pending.remove('upload')
+        if doc_id is None:
+            self.abandon(rng, mix)
+            return
+
+        study = self.request('study', f"/study/{doc_id}")
+        self.pending.remove('study')
+        if study is None:
+            self.abandon(rng, mix)
+            return
+
+        names, weights = zip(*mix.items())
+        while self.remaining:
+            if think_time:
+                time.sleep(rng.expovariate(1.0 / think_time))
+
+            action = rng.choices(names, weights)[0]
+            if action == 'ask':
+                topic, _ = rng.choice(TOPICS)
+                self.post_json('ask', '/api/ask', {'question': f"What is {topic.lower()}?"})
+            elif action == 'summarize':
+                self.post_json('summarize', '/api/summarize', {'ratio': 0.3})
+            else:
+                self.post_json('quiz', '/api/generate-quiz', {'num_mcq': 5, 'num_short': 3})
+            self.remaining -= 1
+
+    def abandon(self, rng, mix):
+        """Count the requests the session could not make as errors"""
+        names, weights = zip(*mix.items())
+        endpoints = self.pending + rng.choices(names, weights, k=self.remaining)
+        self.pending, self.remaining = [], 0
+        for endpoint in endpoints:
+            self.recorder.record(endpoint, None, False)
+
+
+# --------------------------------------------------
+# RESULTS
+# --------------------------------------------------
+class Recorder:
+    """Thread-safe collection of per-endpoint latencies and errors"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.error_samples = {}
+        self.waits = []
+
+    def record(self, endpoint, latency, ok):
+        """Record a request, latency is None for requests that were never sent"""
+        with self.lock:
+            self.requests[endpoint] += 1
+            if latency is not None:
+                self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def record_wait(self, wait):
+        """Record the delay between a session's scheduled arrival and its start"""
+        with self.lock:
+            self.waits.append(wait)
+
+    def note_error(self, endpoint, error):
+        with self.lock:
+            self.error_samples.setdefault(endpoint, str(error))
+
+    def report(self, elapsed):
+        """Summarize latency percentiles, error rate and throughput"""
+        results = {}
+        for endpoint in ENDPOINTS:
+            requests = self.requests[endpoint]
+            if not requests:
+                continue
+            # Abandoned requests count as errors but were never sent
+            sent = len(self.latencies[endpoint])
+            results[endpoint] = {
+                'requests': requests,
+                'sent': sent,
+                'errors': self.errors[endpoint],
+                'error_rate': round(self.errors[endpoint] / requests, 4),
+                **percentiles_ms(self.latencies[endpoint]),
+                'throughput_rps': round(sent / elapsed, 2) if elapsed else 0.0
+            }
+
+        # Client-side queueing once every worker is busy, hidden from request latency
+        if self.waits:
+            results['session_wait'] = {
+                'requests': len(self.waits),
+                'sent': len(self.waits),
+                'errors': 0,
+                'error_rate': 0.0,
+                **percentiles_ms(self.waits),
+                'throughput_rps': round(len(self.waits) / elapsed, 2) if elapsed else 0.0
+            }
+        return results
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def percentiles_ms(values):
+    """p50/p95/p99 in milliseconds, None when nothing was measured"""
+    values = sorted(values)
+    return {
+        f"p{pct}_ms": round(percentile(values, pct) * 1000, 1) if values else None
+        for pct in (50, 95, 99)
+    }
+
+
+def print_report(results, elapsed, error_samples):
+    """Print the results as a table"""
+    print(f"\nCompleted in {elapsed:.1f}s\n")
+    print(f"{'endpoint':<13} {'requests':>8} {'errors':>7} {'err %':>6} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>7}")
+    for endpoint, row in results.items():
+        p50, p95, p99 = (row[key] if row[key] is not None else '-' for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+        print(f"{endpoint:<13} {row['requests']:>8} {row['errors']:>7} {row['error_rate'] * 100:>6.1f} "
+              f"{p50:>9} {p95:>9} {p99:>9} {row['throughput_rps']:>7}")
+
+    for endpoint, error in error_samples.items():
+        print(f"\nfirst {endpoint} error: {error}")
+
+
+# --------------------------------------------------
+# MAIN
+# --------------------------------------------------
+def parse_mix(value):
+    """Parse an action mix such as 'ask=6,summarize=2,quiz=2'"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('ask', 'summarize', 'quiz'):
+            raise argparse.ArgumentTypeError(f"unknown action: {name}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight for {name}: {weight}")
+        if not mix[name] > 0:
+            raise argparse.ArgumentTypeError(f"weight for {name} must be positive")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test for the study assistant")
+    parser.add_argument('--url', help="target a running instance instead of starting one locally")
+    parser.add_argument('--sessions', type=int, default=20, help="number of student sessions to run")
+    parser.add_argument('--concurrency', type=int, default=5, help="maximum simultaneous sessions")
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="session arrivals per second (Poisson), 0 starts them as workers free up")
+    parser.add_argument('--actions', type=int, default=10, help="ask/summarize/quiz calls per session")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('ask=6,summarize=2,quiz=2'),
+                        help="weighted action mix, e.g. ask=6,summarize=2,quiz=2")
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help="mean pause between actions in seconds")
+    parser.add_argument('--sentences', type=int, default=120, help="sentences per generated document")
+    parser.add_argument('--document', help="upload this .txt file instead of a generated document")
+    parser.add_argument('--stub-encoder', action='store_true',
+                        help="replace the sentence transformer with an offline hashing encoder")
+    parser.add_argument('--stub-delay', type=float, default=0.0,
+                        help="seconds each stub encode call sleeps, to simulate model cost")
+    parser.add_argument('--timeout', type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    if args.sessions < 0:
+        parser.error("--sessions must not be negative")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.actions < 0:
+        parser.error("--actions must not be negative")
+    if args.rate < 0:
+        parser.error("--rate must not be negative")
+    if args.url and (args.stub_encoder or args.stub_delay):
+        parser.error("--stub-encoder and --stub-delay only apply to a locally started app, not --url")
+    if args.stub_delay and not args.stub_encoder:
+        parser.error("--stub-delay requires --stub-encoder")
+
+    document = None
+    if args.document:
+        with open(args.document, 'r', encoding='utf-8') as file:
+            document = file.read()
+
+    if args.url:
+        run(args, document, args.url.rstrip('/'))
+        return
+
+    workdir = tempfile.TemporaryDirectory(prefix='loadtest_')
+    server = None
+    try:
+        StubEncoder.delay = args.stub_delay
+        server, base_url = start_local_app(args.stub_encoder, workdir.name)
+        run(args, document, base_url)
+    finally:
+        if server:
+            server.shutdown()
+        os.chdir(ROOT)
+        workdir.cleanup()
+
+
+def run(args, document, base_url):
+    """Replay the sessions against base_url and print the results"""
+    recorder = Recorder()
+
+    def run_session(index, scheduled):
+        if scheduled is not None:
+            recorder.record_wait(time.perf_counter() - scheduled)
+        rng = random.Random(args.seed + index)
+        text = document or build_document(rng, args.sentences)
+        session = StudySession(base_url, recorder, args.timeout)
+        try:
+            session.run(rng, text, args.actions, args.mix, args.think_time)
+        except Exception as e:
+            recorder.note_error('session', e)
+            session.abandon(rng, args.mix)
+
+    arrivals = random.Random(args.seed)
+    start = time.perf_counter()
+    scheduled = start
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for index in range(args.sessions):
+            if args.rate > 0 and index:
+                scheduled += arrivals.expovariate(args.rate)
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+            executor.submit(run_session, index, scheduled if args.rate > 0 else None)
+    elapsed = time.perf_counter() - start
+
+    results = recorder.report(elapsed)
+    if args.json:
+        print(json.dumps({'elapsed_seconds': round(elapsed, 2), 'endpoints': results}, indent=2))
+    else:
+        print_report(results, elapsed, recorder.error_samples)
+
+
+if __name__ == "__main__":
+    main()
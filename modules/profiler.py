@@ -0,0 +1,327 @@
+"""
+Request Profiling Module
+Opt-in cProfile and tracemalloc capture for individual requests
+"""
+
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+
+from flask import g, jsonify, request, send_file
+
+
+class RequestProfiler:
+    """Profiles selected requests and stores the reports under an ID"""
+
+    HEADER = 'X-Profile-Signature'
+    EXPIRES_HEADER = 'X-Profile-Expires'
+    ID_HEADER = 'X-Profile-Id'
+
+    # Source files of the pipeline components, used to break reports down
+    COMPONENTS = {
+        'TextProcessor': os.path.join('modules', 'text_processor.py'),
+        'SemanticSearch': os.path.join('modules', 'semantic_search.py'),
+        'Summarizer': os.path.join('modules', 'summarizer.py'),
+        'QuizGenerator': os.path.join('modules', 'quiz_generator.py'),
+        'DocumentManager': os.path.join('modules', 'document_manager.py'),
+    }
+
+    def __init__(self, app=None):
+        """Initialize profiler"""
+        self.enabled = False
+        self.secret = None
+        self.folder = 'data/profiles'
+        self.top_n = 25
+        self.max_reports = 100
+        self.max_age = 300
+        self.trace_frames = 25
+        # cProfile and tracemalloc are process-wide, so only one request
+        # can be profiled at a time
+        self._lock = threading.Lock()
+        # Request counters so reports show what ran alongside the profiled request
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._overlapping = 0
+        self._skipped = 0
+        self._files_lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register request hooks only when profiling can be triggered"""
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.secret = app.config.get('PROFILING_SECRET')
+        self.folder = app.config.get('PROFILING_FOLDER', self.folder)
+        self.top_n = app.config.get('PROFILING_TOP_N', self.top_n)
+        self.max_reports = app.config.get('PROFILING_MAX_REPORTS', self.max_reports)
+        self.max_age = app.config.get('PROFILING_SIGNATURE_MAX_AGE', self.max_age)
+        self.trace_frames = app.config.get('PROFILING_TRACE_FRAMES', self.trace_frames)
+
+        if not self.enabled and not self.secret:
+            # No hooks at all, so disabled profiling costs nothing
+            return
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        app.teardown_request(self.abort)
+        app.add_url_rule('/api/profiles/<profile_id>', 'get_profile', self.get_profile)
+        app.add_url_rule('/api/profiles/<profile_id>/raw', 'get_profile_raw', self.get_profile_raw)
+
+    def sign(self, path, expires):
+        """Signature a client sends in the profile header for a path and expiry time"""
+        message = f"{path}:{expires}".encode()
+        return hmac.new(self.secret.encode(), message, hashlib.sha256).hexdigest()
+
+    def is_signed(self):
+        """Check the profile headers against the request path and the clock"""
+        signature = request.headers.get(self.HEADER)
+        expires = request.headers.get(self.EXPIRES_HEADER)
+        if not self.secret or not signature or not expires:
+            return False
+
+        try:
+            expires_at = int(expires)
+        except ValueError:
+            return False
+
+        now = time.time()
+        if expires_at < now or expires_at > now + self.max_age:
+            return False
+
+        return hmac.compare_digest(signature.encode(), self.sign(request.path, expires_at).encode())
+
+    def wants_profile(self):
+        """Decide whether the current request should be profiled"""
+        if request.endpoint in (None, 'static', 'get_profile', 'get_profile_raw'):
+            return False
+        if self.is_signed():
+            return True
+        # Page renders are only profiled on request, API calls when enabled
+        return self.enabled and request.method != 'GET'
+
+    # --------------------------------------------------
+    # REQUEST HOOKS
+    # --------------------------------------------------
+    def start(self):
+        """Start cProfile and tracemalloc for the request"""
+        with self._stats_lock:
+            self._in_flight += 1
+            if self._lock.locked():
+                self._overlapping += 1
+        g.profile_counted = True
+
+        if not self.wants_profile():
+            return
+        if not self._lock.acquire(blocking=False):
+            with self._stats_lock:
+                self._skipped += 1
+            return
+
+        with self._stats_lock:
+            self._overlapping = self._in_flight - 1
+
+        g.profile_started = time.perf_counter()
+        g.profile_tracing = not tracemalloc.is_tracing()
+        if g.profile_tracing:
+            # Enough frames to attribute library allocations to the calling module
+            tracemalloc.start(self.trace_frames)
+        tracemalloc.reset_peak()
+
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+    def finish(self, response):
+        """Stop profiling, store the report and return its ID"""
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+
+        try:
+            profile.disable()
+            elapsed = time.perf_counter() - g.profile_started
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with self._stats_lock:
+                overlapping, skipped = self._overlapping, self._skipped
+                self._skipped = 0
+        finally:
+            self._release()
+
+        try:
+            profile_id = uuid.uuid4().hex
+            report = self.build_report(profile, snapshot, elapsed, current, peak)
+            report['id'] = profile_id
+            report['status_code'] = response.status_code
+            report['overlapping_requests'] = overlapping
+            report['skipped_requests'] = skipped
+            self.save_report(profile_id, profile, report)
+            response.headers[self.ID_HEADER] = profile_id
+        except Exception as e:
+            print("Profile report failed:", e)
+
+        return response
+
+    def abort(self, exc=None):
+        """Make sure profiling is stopped if the request never finished"""
+        if g.pop('profile_counted', False):
+            with self._stats_lock:
+                self._in_flight -= 1
+
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        self._release()
+
+    def _release(self):
+        """Stop tracemalloc if this profiler started it and free the lock"""
+        if g.pop('profile_tracing', False):
+            tracemalloc.stop()
+        self._lock.release()
+
+    # --------------------------------------------------
+    # REPORTS
+    # --------------------------------------------------
+    def build_report(self, profile, snapshot, elapsed, current, peak):
+        """Summarize cProfile stats and tracemalloc allocations"""
+        stats = pstats.Stats(profile)
+
+        functions = []
+        for (filename, lineno, name), (cc, nc, tt, ct, _) in stats.stats.items():
+            functions.append({
+                'function': f"{name} ({filename}:{lineno})",
+                'filename': filename,
+                'calls': nc,
+                'tottime': round(tt, 6),
+                'cumtime': round(ct, 6)
+            })
+        functions.sort(key=lambda f: f['cumtime'], reverse=True)
+
+        allocations = [
+            {
+                'location': str(stat.traceback),
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count
+            }
+            for stat in snapshot.statistics('lineno')[:self.top_n]
+        ]
+
+        components = {}
+        for component, path in self.COMPONENTS.items():
+            component_functions = [f for f in functions if f['filename'].endswith(path)]
+            if not component_functions:
+                continue
+            # Match any frame so torch/sklearn/nltk allocations count for the caller
+            traced = snapshot.filter_traces([tracemalloc.Filter(True, '*' + path, all_frames=True)])
+            components[component] = {
+                'cumtime': round(self.entry_time(stats, path), 6),
+                'tottime': round(sum(f['tottime'] for f in component_functions), 6),
+                'retained_kb': round(sum(s.size for s in traced.statistics('filename')) / 1024, 1),
+                'functions': component_functions[:self.top_n]
+            }
+
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(self.top_n)
+
+        return {
+            'method': request.method,
+            'path': request.path,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed_seconds': round(elapsed, 4),
+            'memory': {
+                # tracemalloc is process-wide, overlapping requests are included
+                'scope': 'process',
+                'traceback_frames': snapshot.traceback_limit,
+                'current_kb': round(current / 1024, 1),
+                'peak_kb': round(peak / 1024, 1),
+                'top_allocations': allocations
+            },
+            'components': components,
+            'top_functions': functions[:self.top_n],
+            'stats_text': text.getvalue()
+        }
+
+    def entry_time(self, stats, path):
+        """Time spent in a component, summed over calls made into it from other files"""
+        total = 0.0
+        for (filename, _, _), (_, _, _, _, callers) in stats.stats.items():
+            if not filename.endswith(path):
+                continue
+            # Only calls from other source files, so inner calls are not counted twice.
+            # Builtins ('~') are skipped as they mostly call back in, e.g. list.extend(genexpr)
+            for (caller_file, _, _), (_, _, _, ct) in callers.items():
+                if caller_file != '~' and not caller_file.endswith(path):
+                    total += ct
+        return total
+
+    def save_report(self, profile_id, profile, report):
+        """Write the JSON report and the raw pstats dump"""
+        profile.dump_stats(os.path.join(self.folder, f"{profile_id}.prof"))
+        with open(os.path.join(self.folder, f"{profile_id}.json"), 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        self.prune_reports()
+
+    def prune_reports(self):
+        """Delete the oldest reports beyond PROFILING_MAX_REPORTS"""
+        with self._files_lock:
+            reports = [
+                os.path.join(self.folder, name)
+                for name in os.listdir(self.folder)
+                if name.endswith('.json')
+            ]
+            if len(reports) <= self.max_reports:
+                return
+
+            reports.sort(key=os.path.getmtime)
+            for path in reports[:len(reports) - self.max_reports]:
+                for stale in (path, path[:-len('.json')] + '.prof'):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+
+    def report_path(self, profile_id, extension):
+        """Path of a stored report, or None if the ID is unknown"""
+        if not re.fullmatch(r'[0-9a-f]{32}', profile_id):
+            return None
+        path = os.path.join(self.folder, f"{profile_id}.{extension}")
+        return path if os.path.exists(path) else None
+
+    # --------------------------------------------------
+    # ROUTES
+    # --------------------------------------------------
+    def get_profile(self, profile_id):
+        """Return a stored profile report"""
+        if self.secret and not self.is_signed():
+            return jsonify({"error": "Invalid profile signature"}), 403
+
+        path = self.report_path(profile_id, 'json')
+        if not path:
+            return jsonify({"error": "Profile not found"}), 404
+
+        with open(path, 'r', encoding='utf-8') as file:
+            return jsonify(json.load(file))
+
+    def get_profile_raw(self, profile_id):
+        """Download the raw pstats file for snakeviz / pstats"""
+        if self.secret and not self.is_signed():
+            return jsonify({"error": "Invalid profile signature"}), 403
+
+        path = self.report_path(profile_id, 'prof')
+        if not path:
+            return jsonify({"error": "Profile not found"}), 404
+
+        return send_file(os.path.abspath(path), as_attachment=True,
+                         download_name=f"{profile_id}.prof")
@@ -0,0 +1,72 @@
+"""
+Tests for the load test harness
+"""
+
+import argparse
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest import Recorder, StudySession, parse_mix, percentile, percentiles_ms
+
+
+def test_percentile_is_nearest_rank():
+    values = [0.1 * i for i in range(1, 11)]
+
+    assert percentile(values, 50) == pytest.approx(0.5)
+    assert percentile(values, 95) == pytest.approx(1.0)
+    assert percentile([0.2], 99) == 0.2
+
+
+def test_percentiles_ms():
+    assert percentiles_ms([0.003, 0.001, 0.002]) == {'p50_ms': 2.0, 'p95_ms': 3.0, 'p99_ms': 3.0}
+    assert percentiles_ms([]) == {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+
+
+def test_parse_mix():
+    assert parse_mix('ask=6,summarize=2,quiz') == {'ask': 6.0, 'summarize': 2.0, 'quiz': 1.0}
+
+
+@pytest.mark.parametrize('value', ['grade=1', 'ask=0', 'ask=-1', 'ask=x'])
+def test_parse_mix_rejects_invalid(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix(value)
+
+
+def test_report_counts_abandoned_as_errors_not_throughput():
+    recorder = Recorder()
+    recorder.record('ask', 0.1, True)
+    recorder.record('ask', 0.3, False)
+    recorder.record('ask', None, False)
+    recorder.record('quiz', None, False)
+
+    results = recorder.report(elapsed=2.0)
+
+    assert results['ask']['requests'] == 3
+    assert results['ask']['sent'] == 2
+    assert results['ask']['error_rate'] == pytest.approx(2 / 3, abs=1e-4)
+    assert results['ask']['throughput_rps'] == 1.0
+    assert results['ask']['p99_ms'] == 300.0
+    assert results['quiz'] == {
+        'requests': 1, 'sent': 0, 'errors': 1, 'error_rate': 1.0,
+        'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'throughput_rps': 0.0
+    }
+    assert 'upload' not in results
+
+
+def test_abandon_records_unsent_requests():
+    recorder = Recorder()
+    session = StudySession('http://127.0.0.1:1', recorder, timeout=1)
+    session.remaining = 4
+
+    session.abandon(random.Random(0), {'ask': 1})
+
+    results = recorder.report(elapsed=1.0)
+    assert results['upload']['errors'] == 1
+    assert results['study']['errors'] == 1
+    assert results['ask']['errors'] == 4
+    assert session.pending == [] and session.remaining == 0
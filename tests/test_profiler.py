@@ -0,0 +1,174 @@
+"""
+Tests for the request profiler
+"""
+
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+import pytest
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.profiler import RequestProfiler
+
+SECRET = 'test-secret'
+
+
+def make_app(tmp_path, **config):
+    app = Flask(__name__)
+    app.config.update(TESTING=True, PROFILING_FOLDER=str(tmp_path / 'profiles'), **config)
+
+    @app.route('/api/ask', methods=['POST'])
+    def ask():
+        return jsonify({"answer": " ".join(str(i) for i in range(1000))})
+
+    @app.route('/page')
+    def page():
+        return "page"
+
+    @app.route('/api/fail', methods=['POST'])
+    def fail():
+        raise RuntimeError("boom")
+
+    profiler = RequestProfiler(app)
+    return app, profiler
+
+
+def signed_headers(profiler, path, expires=None):
+    expires = int(time.time()) + 60 if expires is None else expires
+    return {
+        profiler.HEADER: profiler.sign(path, expires),
+        profiler.EXPIRES_HEADER: str(expires)
+    }
+
+
+@pytest.fixture
+def signed_app(tmp_path):
+    return make_app(tmp_path, PROFILING_SECRET=SECRET)
+
+
+def test_valid_signature_is_profiled(signed_app):
+    app, profiler = signed_app
+    response = app.test_client().post('/api/ask', headers=signed_headers(profiler, '/api/ask'))
+
+    profile_id = response.headers[profiler.ID_HEADER]
+    report = app.test_client().get(
+        f'/api/profiles/{profile_id}',
+        headers=signed_headers(profiler, f'/api/profiles/{profile_id}')
+    ).get_json()
+    assert report['path'] == '/api/ask'
+    assert report['memory']['scope'] == 'process'
+    assert report['overlapping_requests'] == 0
+
+
+def test_wrong_signature_is_not_profiled(signed_app):
+    app, profiler = signed_app
+    headers = signed_headers(profiler, '/api/other')
+    response = app.test_client().post('/api/ask', headers=headers)
+    assert profiler.ID_HEADER not in response.headers
+
+
+def test_missing_signature_is_not_profiled(signed_app):
+    app, profiler = signed_app
+    response = app.test_client().post('/api/ask')
+    assert profiler.ID_HEADER not in response.headers
+
+
+def test_expired_signature_is_not_profiled(signed_app):
+    app, profiler = signed_app
+    headers = signed_headers(profiler, '/api/ask', expires=int(time.time()) - 1)
+    response = app.test_client().post('/api/ask', headers=headers)
+    assert profiler.ID_HEADER not in response.headers
+
+
+def test_profile_routes_require_signature(signed_app):
+    app, profiler = signed_app
+    path = '/api/profiles/' + '0' * 32
+
+    assert app.test_client().get(path).status_code == 403
+    assert app.test_client().get(path, headers=signed_headers(profiler, path)).status_code == 404
+
+
+def test_enabled_skips_pages_and_unknown_urls(tmp_path):
+    app, profiler = make_app(tmp_path, PROFILING_ENABLED=True)
+    client = app.test_client()
+
+    assert profiler.ID_HEADER in client.post('/api/ask').headers
+    assert profiler.ID_HEADER not in client.get('/page').headers
+    assert profiler.ID_HEADER not in client.post('/missing').headers
+
+
+def test_old_reports_are_pruned(tmp_path):
+    app, profiler = make_app(tmp_path, PROFILING_ENABLED=True, PROFILING_MAX_REPORTS=2)
+    client = app.test_client()
+    for _ in range(4):
+        client.post('/api/ask')
+
+    files = os.listdir(profiler.folder)
+    assert len([f for f in files if f.endswith('.json')]) == 2
+    assert len([f for f in files if f.endswith('.prof')]) == 2
+
+
+def test_failing_view_releases_profiler(tmp_path):
+    app, profiler = make_app(tmp_path, PROFILING_ENABLED=True)
+
+    with pytest.raises(RuntimeError):
+        app.test_client().post('/api/fail')
+
+    assert not profiler._lock.locked()
+    assert not tracemalloc.is_tracing()
+    assert profiler._in_flight == 0
+
+
+def test_not_configured_registers_nothing(tmp_path):
+    app, profiler = make_app(tmp_path)
+
+    assert not app.before_request_funcs
+    assert not app.after_request_funcs
+    assert not app.teardown_request_funcs
+    assert 'get_profile' not in app.view_functions
+    assert not os.path.exists(profiler.folder)
+
+
+STAND_IN = """
+import time
+
+retained = []
+
+def encode_documents(seconds):
+    retained.extend(bytes(1024) for _ in range(1024))
+    time.sleep(seconds)
+
+def find_answer(seconds):
+    time.sleep(seconds)
+"""
+
+
+def test_component_entered_twice_is_summed(tmp_path):
+    module_path = tmp_path / 'modules' / 'semantic_search.py'
+    module_path.parent.mkdir()
+    module_path.write_text(STAND_IN)
+    spec = importlib.util.spec_from_file_location('stand_in_semantic_search', module_path)
+    search = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(search)
+
+    app, profiler = make_app(tmp_path, PROFILING_ENABLED=True)
+
+    @app.route('/api/search', methods=['POST'])
+    def search_twice():
+        search.encode_documents(0.2)
+        search.find_answer(0.2)
+        return jsonify({})
+
+    client = app.test_client()
+    profile_id = client.post('/api/search').headers[profiler.ID_HEADER]
+    report = client.get(f'/api/profiles/{profile_id}').get_json()
+
+    component = report['components']['SemanticSearch']
+    assert component['cumtime'] == pytest.approx(0.4, abs=0.05)
+    assert component['cumtime'] <= report['elapsed_seconds']
+    assert component['retained_kb'] >= 1024